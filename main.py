@@ -1,9 +1,11 @@
 import os
 import argparse
-import requests
-import pandas as pd
-from datetime import datetime
-import pytz
+import asyncio
+import httpx
+import msgspec
+import numpy as np
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
 # --- Configuration ---
 SYMBOL = 'QQQ'
@@ -11,72 +13,244 @@ TRADIER_URL = "https://api.tradier.com/v1"
 TRADIER_TOKEN = os.environ.get("TRADIER_TOKEN")
 OA_WEBHOOK_BUY = os.environ.get("OA_WEBHOOK_BUY")
 OA_WEBHOOK_SELL = os.environ.get("OA_WEBHOOK_SELL")
+HISTORY_START = '2023-01-01'  # Ensures enough data for 200 SMA on a cold start
+SMA_WINDOW = 200
+SMA_CACHE = os.path.expanduser("~/.cache/qqq_sma.npz")
+HISTORY_REFRESH_MINS = 15  # Intraday, re-check Tradier history at most this often
 
 # Set Timezone to US/Eastern
-EST = pytz.timezone('US/Eastern')
+EST = ZoneInfo('America/New_York')
+
+# --- Tradier response schemas ---
+# msgspec decodes straight into these structs: only the fields we use are
+# materialized, and attribute access beats chained dict lookups.
+
+class Quote(msgspec.Struct):
+    last: float
+    open: float
+    prevclose: float
+
+class QuoteWrapper(msgspec.Struct):
+    quote: Quote
+
+class QuotesResp(msgspec.Struct):
+    quotes: QuoteWrapper
+
+class DayBar(msgspec.Struct):
+    date: str
+    close: float
+
+class History(msgspec.Struct):
+    # Tradier returns a bare dict (not a list) when only one day is in range
+    day: list[DayBar] | DayBar | None = None
+
+class HistoryResp(msgspec.Struct):
+    history: History | None = None
+
+QUOTE_DECODER = msgspec.json.Decoder(QuotesResp)
+HISTORY_DECODER = msgspec.json.Decoder(HistoryResp)
 
 def get_headers():
     return {
         "Authorization": f"Bearer {TRADIER_TOKEN}",
-        "Accept": "application/json"
+        "Accept": "application/json",
+        # Let the server compress the (bandwidth-dominant) history payload;
+        # httpx decompresses transparently
+        "Accept-Encoding": "gzip, br"
     }
 
+def make_client():
+    """Builds the shared async client: one TLS session per host, HTTP/2
+    multiplexing, keep-alive reused across Tradier calls and the webhook POST.
+
+    Every request gets an explicit (connect, read) timeout so a stuck Tradier
+    or OA endpoint can't hang the process forever, plus 2 connect retries."""
+    return httpx.AsyncClient(
+        headers=get_headers(),
+        timeout=httpx.Timeout(10, connect=3.05),
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=30
+            )
+        )
+    )
+
 def is_market_open():
     """Checks if current time is within 9:30 AM - 4:00 PM ET on a weekday."""
     now = datetime.now(EST)
-    
+
     # Check Weekend (Mon=0, Sun=6)
     if now.weekday() > 4:
         print("Market Closed (Weekend).")
         return False
 
-    # Check Hours (09:30 to 16:00)
-    market_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close = now.replace(hour=16, minute=0, second=0, microsecond=0)
-    
-    if market_open <= now <= market_close:
+    # Check Hours: 09:30 (570) to 16:00 (960), inclusive, as minutes since midnight
+    mins = now.hour * 60 + now.minute
+    if 570 <= mins <= 960:
         return True
-    
+
     print("Market Closed (Outside Hours).")
     return False
 
-def get_market_data():
-    """Fetches real-time quote (including prev close) and historical daily data for SMA."""
-    # 1. Get Real-time Quote
-    quote_resp = requests.get(
+def load_sma_cache():
+    """Loads the rolling-SMA state: a ring buffer of the last 200 closes, its
+    write index, the running sum, how many slots are filled, and the last
+    cached trading date ('' on a cold start)."""
+    try:
+        data = np.load(SMA_CACHE)
+        return {
+            'ring': data['ring'].copy(),
+            'idx': int(data['idx']),
+            'sum200': float(data['sum200']),
+            'count': int(data['count']),
+            'last_date': str(data['last_date']),
+            'etag': str(data['etag']) if 'etag' in data.files else '',
+            'last_modified': str(data['last_modified']) if 'last_modified' in data.files else ''
+        }
+    except (FileNotFoundError, OSError, KeyError):
+        return {
+            'ring': np.zeros(SMA_WINDOW),
+            'idx': 0,
+            'sum200': 0.0,
+            'count': 0,
+            'last_date': '',
+            'etag': '',
+            'last_modified': ''
+        }
+
+def next_fetch_start(cache):
+    """First date we still need from Tradier."""
+    if not cache['last_date']:
+        return HISTORY_START
+    last = datetime.strptime(cache['last_date'], '%Y-%m-%d')
+    return (last + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def push_close(cache, date, close):
+    """O(1) rolling update: the new close replaces the oldest slot in the ring
+    and the running sum is adjusted by the difference."""
+    old = cache['ring'][cache['idx']]
+    cache['ring'][cache['idx']] = close
+    cache['sum200'] += close - old
+    cache['idx'] = (cache['idx'] + 1) % SMA_WINDOW
+    cache['count'] = min(cache['count'] + 1, SMA_WINDOW)
+    cache['last_date'] = date
+
+def update_sma_cache(cache, history):
+    """Folds newly fetched bars into the rolling state and persists it."""
+    day = history.day if history else None
+    if not day:
+        if cache['last_date']:
+            # Nothing new, but record the check so the freshness window restarts
+            os.utime(SMA_CACHE, None)
+        return
+
+    if isinstance(day, DayBar):
+        day = [day]
+
+    for bar in day:
+        # Guard against refetching a day already in the cache
+        if bar.date > cache['last_date']:
+            push_close(cache, bar.date, bar.close)
+
+    os.makedirs(os.path.dirname(SMA_CACHE), exist_ok=True)
+    np.savez(SMA_CACHE, **cache)
+
+def conditional_headers(cache):
+    """Validators from the last history fetch, so Tradier can answer with a
+    bodyless 304 when nothing changed."""
+    headers = {}
+    if cache['etag']:
+        headers['If-None-Match'] = cache['etag']
+    if cache['last_modified']:
+        headers['If-Modified-Since'] = cache['last_modified']
+    return headers
+
+def history_is_fresh(cache):
+    """True when the cached SMA already reflects every closed trading day, so
+    the history GET can be skipped.
+
+    A new daily bar only exists after the close, so the cache is fresh when it
+    already holds today's bar (after ~16:05 ET), or when it was checked within
+    the last HISTORY_REFRESH_MINS minutes."""
+    if not cache['count']:
+        return False
+
+    now = datetime.now(EST)
+    if cache['last_date'] == now.strftime('%Y-%m-%d') and now.hour * 60 + now.minute >= 965:
+        return True
+
+    try:
+        age = datetime.now().timestamp() - os.path.getmtime(SMA_CACHE)
+    except OSError:
+        return False
+    return age < HISTORY_REFRESH_MINS * 60
+
+def cached_sma(cache):
+    # Cold start with an empty history response leaves nothing to average
+    if not cache['count']:
+        raise RuntimeError("No history bars cached yet: Tradier returned no daily data")
+    # `count` is capped at SMA_WINDOW, so this is the mean of the last 200
+    # closes (or of everything we have during warm-up)
+    return cache['sum200'] / cache['count']
+
+async def get_market_data(client, cache):
+    """Fetches real-time quote (including prev close) and historical daily data for SMA.
+
+    The rolling-SMA state is cached on disk, so the history request only asks
+    Tradier for the days since the last cached bar (0-1 rows on a typical
+    weekday run instead of ~700) and each new bar updates the SMA in O(1).
+    The quote and history requests are independent, so they are issued
+    concurrently: wall time is one RTT instead of two.
+    """
+    quote_req = client.get(
         f"{TRADIER_URL}/markets/quotes",
-        params={'symbols': SYMBOL},
-        headers=get_headers()
+        params={'symbols': SYMBOL}
     )
+
+    if history_is_fresh(cache):
+        # Cached SMA already reflects every closed trading day: quote only
+        quote_resp = await quote_req
+        history_resp = None
+    else:
+        quote_resp, history_resp = await asyncio.gather(
+            quote_req,
+            client.get(
+                f"{TRADIER_URL}/markets/history",
+                params={
+                    'symbol': SYMBOL,
+                    'interval': 'daily',
+                    'start': next_fetch_start(cache)
+                },
+                headers=conditional_headers(cache)
+            )
+        )
+
     quote_resp.raise_for_status()
-    quote_data = quote_resp.json()['quotes']['quote']
-    
-    current_price = quote_data['last']
-    open_price = quote_data['open']
-    prev_close = quote_data['prevclose']  # Fetches yesterday's closing price
-    
-    # 2. Get Historical Data (Last 300 Days to be safe for SMA200)
-    history_resp = requests.get(
-        f"{TRADIER_URL}/markets/history",
-        params={
-            'symbol': SYMBOL,
-            'interval': 'daily',
-            'start': '2023-01-01' # In production, this ensures enough data for 200 SMA
-        },
-        headers=get_headers()
-    )
-    history_resp.raise_for_status()
-    history = history_resp.json()['history']['day']
-    
-    # Create DataFrame
-    df = pd.DataFrame(history)
-    
-    # Calculate SMA 200 using the last 200 closes
-    sma_200 = df['close'].tail(200).mean()
-    
+
+    quote = QUOTE_DECODER.decode(quote_resp.content).quotes.quote
+
+    current_price = quote.last
+    open_price = quote.open
+    prev_close = quote.prevclose  # Fetches yesterday's closing price
+
+    if history_resp is not None:
+        if history_resp.status_code == 304:
+            # Validators matched: no new bars, no body to parse
+            os.utime(SMA_CACHE, None)
+        else:
+            history_resp.raise_for_status()
+            cache['etag'] = history_resp.headers.get('ETag', '')
+            cache['last_modified'] = history_resp.headers.get('Last-Modified', '')
+            update_sma_cache(cache, HISTORY_DECODER.decode(history_resp.content).history)
+    sma_200 = cached_sma(cache)
+
     return current_price, open_price, prev_close, sma_200
 
-def trigger_webhook(url, signal_type, price, sma, open_p=None):
+async def trigger_webhook(client, url, signal_type, price, sma, open_p=None):
     """Sends payload to Option Alpha."""
     payload = {
         "ticker": SYMBOL,
@@ -89,61 +263,105 @@ def trigger_webhook(url, signal_type, price, sma, open_p=None):
         payload["open_price"] = open_p
 
     print(f"Sending Payload: {payload}")
-    
+
     try:
-        r = requests.post(url, json=payload)
+        r = await client.post(url, json=payload, timeout=5)
         r.raise_for_status()
         print(f"✅ Webhook Sent ({signal_type}): {r.status_code}")
     except Exception as e:
         print(f"❌ Failed to send webhook: {e}")
 
-def run_strategy(mode):
+WEBHOOK_TASKS = set()
+
+def fire_webhook(client, url, signal_type, price, sma, open_p=None):
+    """Schedules the webhook POST in the background so signal evaluation
+    doesn't block on its RTT; pending tasks are awaited at shutdown so the
+    POST (and its error logging) still completes."""
+    task = asyncio.create_task(trigger_webhook(client, url, signal_type, price, sma, open_p))
+    WEBHOOK_TASKS.add(task)
+    task.add_done_callback(WEBHOOK_TASKS.discard)
+    return task
+
+def eval_buy(client, price, open_price, prev_close, sma200):
+    # Criteria 1: Trend Filter (Price must be 4% above SMA200)
+    threshold_sma = sma200 * 1.04
+
+    # Criteria 2: Dip Filter (Price must be 1% below PREVIOUS CLOSE)
+    # Using Prev Close captures overnight gap downs
+    threshold_dip = prev_close * 0.99
+
+    print(f"Buy Criteria: Price >= {threshold_sma:.2f} (SMA+4%) AND Price <= {threshold_dip:.2f} (Close-1%)")
+
+    if (price >= threshold_sma) and (price <= threshold_dip):
+        print(">>> BUY SIGNAL TRIGGERED <<<")
+        fire_webhook(client, OA_WEBHOOK_BUY, "BUY", price, sma200, open_price)
+    else:
+        print("No Buy Signal.")
+
+def eval_sell(client, price, sma200):
+    # Criteria: Price < 0.97 * SMA200 (Stop Loss / Exit Condition)
+    threshold_sell = sma200 * 0.97
+    print(f"Sell Criteria: Price < {threshold_sell:.2f}")
+
+    if price < threshold_sell:
+        print(">>> SELL SIGNAL TRIGGERED <<<")
+        fire_webhook(client, OA_WEBHOOK_SELL, "SELL", price, sma200)
+    else:
+        print("No Sell Signal.")
+
+async def run_strategy(client, mode, cache):
+    """Fetches market data once and evaluates the requested signal(s).
+
+    `both` evaluates buy and sell against the same snapshot, so one scheduled
+    run replaces the separate buy and sell invocations (half the API calls).
+    """
     # Skip execution if market is closed (save API calls)
     if not is_market_open():
         return
 
     print(f"--- Running {mode.upper()} Logic for {SYMBOL} ---")
-    
+
     try:
-        price, open_price, prev_close, sma200 = get_market_data()
+        price, open_price, prev_close, sma200 = await get_market_data(client, cache)
     except Exception as e:
         print(f"Error fetching data: {e}")
         return
 
     print(f"Price: {price} | Open: {open_price} | Prev Close: {prev_close} | SMA200: {sma200:.2f}")
 
-    # --- BUY LOGIC ---
-    if mode == 'buy':
-        # Criteria 1: Trend Filter (Price must be 4% above SMA200)
-        threshold_sma = sma200 * 1.04
-        
-        # Criteria 2: Dip Filter (Price must be 1% below PREVIOUS CLOSE)
-        # Using Prev Close captures overnight gap downs
-        threshold_dip = prev_close * 0.99
-        
-        print(f"Buy Criteria: Price >= {threshold_sma:.2f} (SMA+4%) AND Price <= {threshold_dip:.2f} (Close-1%)")
-        
-        if (price >= threshold_sma) and (price <= threshold_dip):
-            print(">>> BUY SIGNAL TRIGGERED <<<")
-            trigger_webhook(OA_WEBHOOK_BUY, "BUY", price, sma200, open_price)
-        else:
-            print("No Buy Signal.")
-
-    # --- SELL LOGIC ---
-    elif mode == 'sell':
-        # Criteria: Price < 0.97 * SMA200 (Stop Loss / Exit Condition)
-        threshold_sell = sma200 * 0.97
-        print(f"Sell Criteria: Price < {threshold_sell:.2f}")
-        
-        if price < threshold_sell:
-            print(">>> SELL SIGNAL TRIGGERED <<<")
-            trigger_webhook(OA_WEBHOOK_SELL, "SELL", price, sma200)
-        else:
-            print("No Sell Signal.")
+    if mode in ('buy', 'both'):
+        eval_buy(client, price, open_price, prev_close, sma200)
+
+    if mode in ('sell', 'both'):
+        eval_sell(client, price, sma200)
+
+def seconds_until_next_minute():
+    now = datetime.now(EST)
+    return 60 - now.second - now.microsecond / 1e6
+
+async def main(mode):
+    """Long-running loop: one tick per market minute.
+
+    The interpreter, the keep-alive connection pool and the SMA state all stay
+    warm across ticks, so only the first run of the day pays import, TLS
+    handshake and cache-load costs. Run under systemd or a Docker restart
+    policy instead of cron.
+    """
+    client = make_client()
+    cache = load_sma_cache()
+    try:
+        while True:
+            await run_strategy(client, mode, cache)
+            await asyncio.sleep(seconds_until_next_minute())
+    finally:
+        # Let any in-flight webhook POSTs finish before tearing down the client
+        if WEBHOOK_TASKS:
+            await asyncio.gather(*WEBHOOK_TASKS)
+        await client.aclose()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--mode', choices=['buy', 'sell'], required=True)
+    parser.add_argument('--mode', choices=['buy', 'sell', 'both'], required=True)
     args = parser.parse_args()
-    
-    run_strategy(args.mode)
\ No newline at end of file
+
+    asyncio.run(main(args.mode))